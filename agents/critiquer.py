@@ -1,10 +1,11 @@
 # critiquer.py
 
 import logging
-from typing import TypedDict
+from typing import TypedDict, List, Dict
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.pydantic_v1 import BaseModel, Field
+from cassette import llm_boundary
 
 # Define the output structure for the Critiquer Agent
 class Critique(BaseModel):
@@ -21,11 +22,21 @@ class Critique(BaseModel):
         description="A detailed, constructive critique. Explain why you gave the score. Point out specific claims that are unsupported or sections that are off-topic."
     )
 
+class ItemCritique(Critique):
+    """A critique of one item in a batch, identified by the item number it was given."""
+    item: int = Field(description="The number of the item being critiqued, exactly as given in the input.")
+
+class CritiqueBatch(BaseModel):
+    """Represents the critiques of several report sections reviewed in a single call."""
+    critiques: List[ItemCritique] = Field(description="One critique per item, covering every item in the input.")
+
 def get_critiquer_agent():
     """Initializes and returns the Critiquer Agent."""
-    llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0.0)
-    
-    structured_llm = llm.with_structured_output(Critique)
+    structured_llm = llm_boundary(
+        "critiquer",
+        lambda: ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0.0).with_structured_output(Critique),
+        output_type=Critique,
+    )
 
     prompt_template = """
 You are an expert academic editor and fact-checker. Your task is to critique a written report section based *only* on the provided search results (context).
@@ -54,3 +65,67 @@ You are an expert academic editor and fact-checker. Your task is to critique a w
     logging.info("Critiquer Agent initialized successfully.")
     return critiquer_agent
 
+
+def get_batch_critiquer_agent():
+    """Initializes and returns the Critiquer Agent for reviewing several sections in one call."""
+    structured_llm = llm_boundary(
+        "batch_critiquer",
+        lambda: ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0.0).with_structured_output(CritiqueBatch),
+        output_type=CritiqueBatch,
+    )
+
+    prompt_template = """
+You are an expert academic editor and fact-checker. Your task is to critique several written report sections, each based *only* on its own search results (context).
+
+**Items to Critique:**
+{items}
+
+**Instructions (apply to each item independently, using only that item's context):**
+1.  **Check for Fallback:** If the "Written Section" contains the exact phrase "*Generated using LLM due to insufficient search results.*", the writer has intentionally used its fallback. You MUST give it a score of 8 and a simple critique like "Writer fallback detected due to insufficient context. Passing."
+2.  **Primary Goal: Grounding.** If no fallback is detected, determine if all claims in the "Written Section" are fully supported by its "Search Results."
+3.  **Secondary Goal: Relevance.** Check if the information used from the context is relevant to the item's "Section Topic." If the section discusses something completely unrelated, the score must be low (e.g., 3-4).
+4.  **Scoring (if no fallback):** Assign a score from 1 to 10. 8-10 means well-supported and relevant; below 8 means significant issues with unsupported claims or irrelevant information.
+5.  **Provide Detailed Feedback:** In each critique, list every specific claim that is not supported by the context or is off-topic. Be precise.
+6.  **Return one critique per item**, with its "item" set to the item number.
+"""
+    prompt = ChatPromptTemplate.from_template(prompt_template)
+    batch_critiquer_agent = prompt | structured_llm
+    logging.info("Batch Critiquer Agent initialized successfully.")
+    return batch_critiquer_agent
+
+def run_batch_critique(batch_agent, single_agent, items: List[Dict]) -> List[Critique]:
+    """
+    Critiques several sections with one LLM call.
+    Items the batch response misses are critiqued individually with `single_agent`.
+
+    Args:
+        batch_agent: The batch critiquer agent chain.
+        single_agent: The per-section critiquer agent chain, used as a fallback.
+        items (List[Dict]): Dicts with "topic", "section" and "context" keys.
+
+    Returns:
+        List[Critique]: One critique per item, in the same order.
+    """
+    formatted_items = "\n\n".join(
+        f"### Item {number}\n"
+        f"**Section Topic:**\n\"{item['topic']}\"\n\n"
+        f"**Written Section:**\n{item['section']}\n\n"
+        f"**Search Results (Context):**\n{item['context']}"
+        for number, item in enumerate(items, start=1)
+    )
+    by_item = {}
+    try:
+        response = batch_agent.invoke({"items": formatted_items})
+        if response is not None:
+            by_item = {critique.item: critique for critique in response.critiques}
+    except Exception as e:
+        logging.error(f"Batch critique failed; falling back to individual critiques: {e}")
+
+    critiques = []
+    for number, item in enumerate(items, start=1):
+        critique = by_item.get(number)
+        if critique is None:
+            logging.warning(f"Batch critique missed item {number}; critiquing it individually.")
+            critique = single_agent.invoke(item)
+        critiques.append(Critique(score=critique.score, critique=critique.critique))
+    return critiques
@@ -6,6 +6,7 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_google_vertexai import ChatVertexAI
 from google.oauth2 import service_account
 from langchain_google_genai import ChatGoogleGenerativeAI
+from cassette import llm_boundary
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -24,12 +25,12 @@ def get_editor_agent():
         #     credentials=credentials,
         #     temperature=0.0
         # )
-        llm = ChatGoogleGenerativeAI(
+        llm = llm_boundary("editor", lambda: ChatGoogleGenerativeAI(
             model="gemini-2.0-flash",
             # project="research-agent-473309",
             # credentials=credentials,
             temperature=0.0
-        )
+        ))
         editor_prompt = ChatPromptTemplate.from_messages(
             [
                 (
@@ -62,6 +63,29 @@ def get_editor_agent():
         logging.error(f"Error initializing Editor Agent: {e}")
         raise
 
+def assemble_report_sections(outline: list, completed_sections: List[str]) -> List[str]:
+    """
+    Renders the outline tree locally, placing each approved leaf section under its
+    parent headings. Parent headings are never written by the LLM.
+
+    Args:
+        outline (list): The main sections of the outline (a list of `OutlineNode`).
+        completed_sections (List[str]): The approved leaf sections, in outline order.
+
+    Returns:
+        List[str]: One Markdown block per main section.
+    """
+    leaf_contents = iter(completed_sections)
+
+    def render(node, depth: int) -> str:
+        heading = f"{'#' * min(depth + 2, 6)} {node.title}"
+        if not node.subsections:
+            return f"{heading}\n\n{next(leaf_contents, '')}"
+        children = "\n\n".join(render(child, depth + 1) for child in node.subsections)
+        return f"{heading}\n\n{children}"
+
+    return [render(node, 0) for node in outline]
+
 def run_editor_agent(agent, topic: str, sections: List[str]) -> str:
     """
     Runs the Editor Agent to assemble and polish the final report.
@@ -1,14 +1,102 @@
 # planner.py
 
+import re
 import logging
+from typing import List
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+from langchain_core.pydantic_v1 import BaseModel, Field
 from langchain_google_vertexai import ChatVertexAI
 from google.oauth2 import service_account
 from langchain_google_genai import ChatGoogleGenerativeAI
+from cassette import llm_boundary
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Define the output structure for the Planner Agent
+class OutlineNode(BaseModel):
+    """
+    Represents a single heading in the report outline.
+    A node without subsections is a leaf: only leaves are searched and written,
+    parent headings are rendered locally when the report is assembled.
+    """
+    title: str = Field(description="The heading text, e.g. 'I. Introduction' or 'A. Background on Topic'.")
+    subsections: List["OutlineNode"] = Field(
+        default_factory=list,
+        description="The subsections nested under this heading. Empty for a leaf subsection."
+    )
+
+OutlineNode.update_forward_refs()
+
+class Outline(BaseModel):
+    """Represents the full hierarchical outline of a report."""
+    sections: List[OutlineNode] = Field(description="The main sections of the report, in order.")
+
+def outline_leaves(outline: List[OutlineNode]) -> List[OutlineNode]:
+    """Returns the leaf nodes of the outline in reading (depth-first) order."""
+    leaves = []
+    for node in outline:
+        if node.subsections:
+            leaves.extend(outline_leaves(node.subsections))
+        else:
+            leaves.append(node)
+    return leaves
+
+ROMAN_NUMERALS = ["I", "II", "III", "IV", "V", "VI", "VII", "VIII", "IX", "X"]
+
+def _has_main_marker(raw: str) -> bool:
+    """True for Markdown headings and bold bullets, which the planner prompt uses for main sections."""
+    return raw.startswith('#') or re.match(r'^[*\-]?\s*\*\*', raw) is not None
+
+def _main_section_rule(lines: List[str]):
+    """
+    Picks how main sections are recognised in an outline without a fixed structure:
+    by bold/heading markers if any line has one, else by the next Roman numeral in sequence,
+    else by "1."-style numbering. Returns None when nothing marks main sections.
+    """
+    if any(_has_main_marker(raw) for raw in lines):
+        return lambda raw, title, count: _has_main_marker(raw)
+    titles = [re.sub(r'^[*\-#\s]+', '', raw) for raw in lines]
+    if any(title.startswith(f"{ROMAN_NUMERALS[0]}. ") for title in titles):
+        return lambda raw, title, count: count < len(ROMAN_NUMERALS) and title.startswith(f"{ROMAN_NUMERALS[count]}. ")
+    if any(re.match(r'^\d+\.\s', title) for title in titles):
+        return lambda raw, title, count: re.match(r'^\d+\.\s', title) is not None
+    return None
+
+def parse_markdown_outline(markdown: str) -> List[OutlineNode]:
+    """
+    Fallback parser that turns a Markdown bullet outline into an outline tree.
+    Bold bullets and Markdown headings start a main section; every other bullet is
+    attached as a subsection of the last main section. Only if the outline has no such
+    markers at all are main sections recognised by the next Roman numeral in sequence
+    (so subsection letters like "C." or "I." are never mistaken for main sections), or
+    failing that by "1."-style numbering. Lines before the first main section, such as
+    "Here is the outline:", are dropped. An outline with no main sections is kept flat.
+    """
+    lines = [line.strip() for line in markdown.split('\n')]
+    lines = [raw for raw in lines if raw and not raw.startswith('```')]
+    is_main_section = _main_section_rule(lines)
+
+    outline = []
+    for raw in lines:
+        title = re.sub(r'^[*\-#\s]+', '', raw).replace('**', '').strip()
+        if not title:
+            continue
+        if is_main_section is None or is_main_section(raw, title, len(outline)):
+            outline.append(OutlineNode(title=title))
+        elif outline:
+            outline[-1].subsections.append(OutlineNode(title=title))
+        else:
+            logging.info(f"Ignoring outline line before the first main section: '{title}'")
+    return outline
+
+def _require_outline(outline):
+    """Raises if structured output came back empty, so the Markdown fallback runs instead."""
+    if not isinstance(outline, Outline) or not outline.sections:
+        raise ValueError("Planner returned no structured outline.")
+    return outline
+
 def get_planner_agent():
     """Initializes and returns the Planner Agent."""
     try:
@@ -20,12 +108,14 @@ def get_planner_agent():
         #     credentials=credentials,
         #     temperature=0.0
         # )
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            # project="research-agent-473309",
-            # credentials=credentials,
-            temperature=0.0
-        )
+        # The model is only built when a live call is needed (see cassette.llm_boundary)
+        def make_llm():
+            return ChatGoogleGenerativeAI(
+                model="gemini-2.0-flash",
+                # project="research-agent-473309",
+                # credentials=credentials,
+                temperature=0.0
+            )
         
         ## THE FIX: Modify the instructions to request a smaller outline.
         ## This ensures the total number of sections is less than the daily API limit of 50.
@@ -39,8 +129,9 @@ You are an expert research assistant. Your task is to create a structured outlin
 1.  Generate a hierarchical outline with 3-5 main sections.
 2.  Each main section should have 2-4 subsections.
 3.  **Crucially, the total number of sections and subsections combined must be between 15 and 25.** This is a strict requirement to manage workload.
-4.  Use Markdown for formatting (e.g., use '*' for bullet points).
-5.  Output ONLY the Markdown outline. Do not include any other text.
+4.  Main sections are headings only; each subsection is what will be researched and written.
+5.  Use Markdown for formatting (e.g., use '*' for bullet points), with main sections in bold.
+6.  Output ONLY the Markdown outline. Do not include any other text.
 
 **Example Output:**
 * **I. Introduction**
@@ -52,7 +143,11 @@ You are an expert research assistant. Your task is to create a structured outlin
 * C. Sub-point C
 """
         prompt = ChatPromptTemplate.from_template(prompt_template)
-        planner_agent = prompt | llm
+        # Ask for the typed outline tree first; if structured output fails, fall back to the
+        # plain Markdown response, which run_planner_agent parses into the same tree.
+        structured_llm = llm_boundary("planner", lambda: make_llm().with_structured_output(Outline), output_type=Outline)
+        structured_planner = prompt | structured_llm | RunnableLambda(_require_outline)
+        planner_agent = structured_planner.with_fallbacks([prompt | llm_boundary("planner_markdown", make_llm)])
         # planner_agent: It's a special, executable LangChain object called a "Runnable"(takes i/p returns o/p) or a "Chain, NOT A STRING"
         logging.info("Planner Agent initialized successfully.")
         return planner_agent
@@ -60,20 +155,31 @@ You are an expert research assistant. Your task is to create a structured outlin
         logging.error(f"Error initializing Planner Agent: {e}")
         return None
 
-def run_planner_agent(planner_agent, topic: str) -> list:
-    """Runs the planner agent to generate a research report outline."""
+def run_planner_agent(planner_agent, topic: str) -> List[OutlineNode]:
+    """
+    Runs the planner agent to generate a hierarchical research report outline.
+
+    Returns:
+        List[OutlineNode]: The main sections of the outline. Only the leaves of this
+        tree (see `outline_leaves`) are searched and written.
+    """
     logging.info(f"Running Planner Agent for topic: {topic}")
     try:
         response = planner_agent.invoke({"topic": topic})
-        
-        outline = [line.strip() for line in response.content.split('\n') if line.strip()]
 
-        if not outline or len(outline) > 50:
-            logging.error(f"Planner agent generated an invalid or excessively long outline (sections: {len(outline)}).")
-            return ["Error: Planner failed to generate a valid outline."]
-            
-        logging.info("Planner Agent finished successfully.")
+        if isinstance(response, Outline):
+            outline = response.sections
+        else:
+            logging.warning("Planner structured output unavailable; parsing the Markdown outline instead.")
+            outline = parse_markdown_outline(response.content)
+
+        leaves = outline_leaves(outline)
+        if not leaves or len(leaves) > 50:
+            logging.error(f"Planner agent generated an invalid or excessively long outline (sections: {len(leaves)}).")
+            return [OutlineNode(title="Error: Planner failed to generate a valid outline.")]
+
+        logging.info(f"Planner Agent finished successfully with {len(outline)} main sections and {len(leaves)} subsections.")
         return outline
     except Exception as e:
         logging.error(f"An error occurred in the planner agent: {e}")
-        return [f"Error in planner: {e}"]
\ No newline at end of file
+        return [OutlineNode(title=f"Error in planner: {e}")]
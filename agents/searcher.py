@@ -1,49 +1,289 @@
 # searcher.py
 
+import time
 import asyncio
 import logging
-from .utils import clean_section_title
+import threading
+from collections import Counter, defaultdict, deque
+from concurrent.futures import Future
+from .utils import clean_section_title, normalize_query
 from tools.web_search_tools import search_tavily
 from tools.academic_search_tools import search_arxiv, search_semantic_scholar
 from tools.news_search_tools import search_news
+from tools.corpus_index import get_corpus_index
+from tools.search_result import SearchResult
+from tools.full_text_tools import enrich_with_full_text
+import cassette
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-async def search_section(section: str, topic: str, semaphore: asyncio.Semaphore):
+# Local corpus coverage: a section skips the network when at least LOCAL_MIN_HITS previously
+# fetched results score LOCAL_MIN_SIMILARITY or higher against the section, were fetched for a
+# topic scoring LOCAL_MIN_TOPIC_SIMILARITY or higher against the report topic (the same domain),
+# and are no older than LOCAL_MAX_AGE_SECONDS.
+LOCAL_TOP_K = 14
+LOCAL_MIN_HITS = 6
+LOCAL_MIN_SIMILARITY = 0.3
+LOCAL_MIN_TOPIC_SIMILARITY = 0.4
+LOCAL_MAX_AGE_SECONDS = 7 * 24 * 3600
+
+# Maximum number of sections searched at the same time
+SEARCH_CONCURRENCY = 3
+
+# Providers queried for every section, with the number of results requested from each
+SEARCH_PROVIDERS = [
+    (search_tavily, 5),
+    (search_arxiv, 3),
+    (search_semantic_scholar, 3),
+    (search_news, 3),
+]
+
+# Providers that may receive a hedged duplicate request once they exceed their observed p95.
+# Semantic Scholar and NewsAPI serialize requests behind a lock, so a hedge would only queue.
+HEDGED_PROVIDERS = {"search_tavily", "search_arxiv"}
+MIN_LATENCY_SAMPLES = 5
+# Latency samples older than this are ignored, so a provider dropped as slow is probed
+# again once its old samples expire instead of staying excluded for the whole process.
+LATENCY_WINDOW_SECONDS = 15 * 60
+# After the last section returns, stragglers get this long (at most one section deadline)
+# to deliver late results for the metrics and the local corpus before they are cancelled
+STRAGGLER_GRACE_SECONDS = 3.0
+
+_provider_latencies = defaultdict(lambda: deque(maxlen=100))
+_search_metrics = {"deadline_misses": Counter(), "late_results": Counter(), "hedges": Counter()}
+_metrics_lock = threading.Lock()
+
+def _record_latency(provider: str, seconds: float):
+    with _metrics_lock:
+        _provider_latencies[provider].append((time.monotonic(), seconds))
+
+def _provider_p95(provider: str):
+    """Returns the recent p95 latency of a provider in seconds, or None with too few samples."""
+    cutoff = time.monotonic() - LATENCY_WINDOW_SECONDS
+    with _metrics_lock:
+        samples = sorted(seconds for recorded_at, seconds in _provider_latencies[provider] if recorded_at >= cutoff)
+    if len(samples) < MIN_LATENCY_SAMPLES:
+        return None
+    return samples[int(0.95 * (len(samples) - 1))]
+
+def get_slow_providers(threshold: float) -> set:
+    """Returns the names of providers whose recent p95 latency exceeds `threshold` seconds."""
+    slow = set()
+    for search_fn, _ in SEARCH_PROVIDERS:
+        p95 = _provider_p95(search_fn.__name__)
+        if p95 is not None and p95 > threshold:
+            slow.add(search_fn.__name__)
+    return slow
+
+def get_search_metrics() -> dict:
+    """Returns a snapshot of deadline misses, late results and hedges, counted per provider."""
+    with _metrics_lock:
+        return {name: dict(counter) for name, counter in _search_metrics.items()}
+
+def _log_search_metrics(before: dict):
+    """Logs the deadline misses, late results and hedges counted since the `before` snapshot."""
+    counts = {
+        name: {provider: count - before[name].get(provider, 0)
+               for provider, count in counter.items() if count > before[name].get(provider, 0)}
+        for name, counter in get_search_metrics().items()
+    }
+    if any(counts.values()):
+        logging.info(
+            f"Search metrics for this run: deadline misses {counts['deadline_misses']}, "
+            f"late results {counts['late_results']}, hedges {counts['hedges']}."
+        )
+
+# In-flight provider requests, keyed by (provider, normalized query, max_results).
+# These are thread-safe futures so concurrent runs (each on its own event loop) can share them.
+_inflight_searches = {}
+_inflight_lock = threading.Lock()
+
+class _OwnerCancelled(Exception):
+    """Tells waiters that the run performing a shared request was cancelled, so they should retry."""
+
+async def _single_flight(search_fn, query: str, max_results: int) -> list:
+    """
+    Runs `search_fn(query, max_results=...)`, merging identical in-flight requests.
+    The first caller for a normalized query performs the request; every other caller
+    awaits the same result future. Cancellation never crosses between callers: a waiter
+    giving up leaves the request running, and if the owner is cancelled its waiters retry.
+    """
+    if cassette.is_active():
+        # Each run records into its own cassette, so requests are never shared while one is active
+        return list(await search_fn(query, max_results=max_results))
+    key = (search_fn.__name__, normalize_query(query), max_results)
+    while True:
+        with _inflight_lock:
+            future = _inflight_searches.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                # A running future can no longer be cancelled by any waiter
+                future.set_running_or_notify_cancel()
+                _inflight_searches[key] = future
+
+        if is_owner:
+            try:
+                results = await search_fn(query, max_results=max_results)
+            except asyncio.CancelledError:
+                with _inflight_lock:
+                    _inflight_searches.pop(key, None)
+                future.set_exception(_OwnerCancelled())
+                raise
+            except Exception as e:
+                with _inflight_lock:
+                    _inflight_searches.pop(key, None)
+                future.set_exception(e)
+                raise
+            with _inflight_lock:
+                _inflight_searches.pop(key, None)
+            future.set_result(results)
+            return list(results)
+
+        logging.info(f"Joining in-flight {search_fn.__name__} request for '{query}'")
+        try:
+            results = await asyncio.shield(asyncio.wrap_future(future))
+        except _OwnerCancelled:
+            logging.info(f"In-flight {search_fn.__name__} request for '{query}' was cancelled; retrying.")
+            continue
+        return list(results)
+
+async def _hedged_search(search_fn, query: str, max_results: int) -> list:
+    """
+    Runs a coalesced provider search. If the provider is hedgeable and the request outlives
+    its observed p95, a duplicate request is sent and whichever finishes first is used.
+    """
+    provider = search_fn.__name__
+    started = time.monotonic()
+    try:
+        return await _timed_search(search_fn, query, max_results, started)
+    except asyncio.CancelledError:
+        # Cancelled as a straggler after missing its deadline. The elapsed time is a lower
+        # bound on its latency, so a provider that always misses still gets slow samples.
+        _record_latency(provider, time.monotonic() - started)
+        raise
+
+async def _timed_search(search_fn, query: str, max_results: int, started: float) -> list:
+    """Performs `_hedged_search`, recording the latency of requests that complete."""
+    provider = search_fn.__name__
+    primary = asyncio.ensure_future(_single_flight(search_fn, query, max_results))
+    # Hedging depends on timing, so it is off while a cassette records or replays
+    hedgeable = provider in HEDGED_PROVIDERS and not cassette.is_active()
+    p95 = _provider_p95(provider) if hedgeable else None
+
+    if p95 is not None:
+        done, _ = await asyncio.wait({primary}, timeout=p95)
+        if not done:
+            logging.info(f"{provider} exceeded its p95 ({p95:.1f}s) for '{query}'; sending a hedged request.")
+            with _metrics_lock:
+                _search_metrics["hedges"][provider] += 1
+            hedge = asyncio.ensure_future(search_fn(query, max_results=max_results))
+            try:
+                done, _ = await asyncio.wait({primary, hedge}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                # The primary may be shared with other sections, so only the hedge is cancelled.
+                if not hedge.done():
+                    hedge.cancel()
+            winner = primary if primary in done else hedge
+            results = winner.result()
+            _record_latency(provider, time.monotonic() - started)
+            return results
+
+    results = await primary
+    _record_latency(provider, time.monotonic() - started)
+    return results
+
+def _record_late_result(provider: str, section: str, topic: str, started: float):
+    """Returns a done-callback that records results arriving after a section's deadline."""
+    def callback(task: asyncio.Task):
+        if task.cancelled() or task.exception() is not None:
+            return
+        results = task.result()
+        with _metrics_lock:
+            _search_metrics["late_results"][provider] += len(results)
+        logging.info(f"{provider} returned {len(results)} late results for section '{section}' after {time.monotonic() - started:.1f}s.")
+        # The section has moved on, but the results are still worth keeping locally
+        get_corpus_index().add(results, topic)
+    return callback
+
+async def search_section(section_id: int, section: str, topic: str, semaphore: asyncio.Semaphore,
+                         deadline: float = None, stragglers: set = None, providers: list = None,
+                         use_corpus: bool = True):
     """
     Asynchronously searches for information on a single section of the report
-    using web, academic, and news sources.
+    using web, academic, and news sources. Results are tagged with `section_id`,
+    the section's index in the outline.
+
+    If `deadline` (seconds) is given, the section proceeds with whatever has arrived when
+    the budget runs out. Unfinished provider tasks are added to `stragglers` so the caller
+    can cancel them; any results they still deliver are recorded as late.
+    `providers` defaults to SEARCH_PROVIDERS. With `use_corpus` False the local corpus
+    is never consulted, though fresh results are still indexed into it.
     """
+    providers = SEARCH_PROVIDERS if providers is None else providers
     async with semaphore:
         cleaned_section = clean_section_title(section)
         query = f"{topic}: {cleaned_section}"
         
+        # Check the local corpus first; only go to the network when coverage is too low.
+        # Skipped while recording or replaying a cassette so runs stay reproducible.
+        corpus = get_corpus_index()
+        local_results = [] if cassette.is_active() or not use_corpus else corpus.search(
+            cleaned_section, topic, k=LOCAL_TOP_K, min_score=LOCAL_MIN_SIMILARITY,
+            min_topic_score=LOCAL_MIN_TOPIC_SIMILARITY, max_age=LOCAL_MAX_AGE_SECONDS
+        )
+        if len(local_results) >= LOCAL_MIN_HITS:
+            logging.info(f"Local corpus covers section '{section}' with {len(local_results)} results; skipping network search.")
+            return [item.with_section(section_id) for item in local_results]
+
         logging.info(f"Starting comprehensive search for section: '{section}'")
         
-        # Define all search tasks for the current section
-        # It contains four awaitable coroutine objects. 
+        # Define all search tasks for the current section, one per provider
+        started = time.monotonic()
         search_tasks = [
-            search_tavily(query, max_results=5),
-            search_arxiv(query, max_results=3),
-            search_semantic_scholar(query, max_results=3),
-            search_news(query, max_results=3)
+            asyncio.ensure_future(_hedged_search(search_fn, query, max_results))
+            for search_fn, max_results in providers
         ]
         
         try:
             # Run all searches concurrently for this section
-            results_from_all_sources = await asyncio.gather(*search_tasks, return_exceptions=True)
+            if deadline is None:
+                results_from_all_sources = await asyncio.gather(*search_tasks, return_exceptions=True)
+            else:
+                await asyncio.wait(search_tasks, timeout=deadline)
+                results_from_all_sources = []
+                for (search_fn, _), task in zip(providers, search_tasks):
+                    if task.cancelled():
+                        # e.g. a coalesced request whose owner was cancelled; count it as a failed provider
+                        results_from_all_sources.append(Exception(f"{search_fn.__name__} search was cancelled"))
+                        continue
+                    if task.done():
+                        results_from_all_sources.append(task.exception() or task.result())
+                        continue
+                    provider = search_fn.__name__
+                    logging.warning(f"{provider} missed the {deadline:g}s deadline for section '{section}'; proceeding without it.")
+                    with _metrics_lock:
+                        _search_metrics["deadline_misses"][provider] += 1
+                    task.add_done_callback(_record_late_result(provider, section, topic, started))
+                    if stragglers is not None:
+                        stragglers.add(task)
+                    else:
+                        task.cancel()
             
             # Flatten the list of lists and tag each result with its section
             final_section_results = []
             for source_results in results_from_all_sources:
                 if isinstance(source_results, list):
                     for item in source_results:
-                        if isinstance(item, dict):
-                            item['section'] = section  # Tag with the original section title
-                            final_section_results.append(item)
+                        if isinstance(item, SearchResult):
+                            final_section_results.append(item.with_section(section_id))
                 elif isinstance(source_results, Exception):
                     logging.error(f"A search task failed for section '{section}': {source_results}")
+
+            added = corpus.add(final_section_results, topic)
+            if added:
+                logging.info(f"Indexed {added} new results into the local corpus.")
             
             logging.info(f"Found {len(final_section_results)} total results for section '{section}'")
             return final_section_results
@@ -54,15 +294,35 @@ async def search_section(section: str, topic: str, semaphore: asyncio.Semaphore)
 
 # he single underscore _ at the beginning of _run_concurrent_searches is a convention in Python to signal that this function is
 # intended for internal use only within the searcher.py file.
-async def _run_concurrent_searches(outline: list, topic: str):
+async def _run_concurrent_searches(outline: list, topic: str, section_deadline: float = None,
+                                   excluded_providers: set = None, use_corpus: bool = True):
     """
     Manages the concurrent execution of comprehensive searches for all sections.
     """
-    semaphore = asyncio.Semaphore(3)  # Limit concurrent sections being processed
-    tasks = [search_section(section, topic, semaphore) for section in outline]
+    semaphore = asyncio.Semaphore(SEARCH_CONCURRENCY)  # Limit concurrent sections being processed
+    if section_deadline is not None and cassette.is_active():
+        # Which providers beat the deadline depends on timing, which a replay cannot reproduce
+        logging.info("Cassette active: ignoring the per-section search deadline so the run replays exactly.")
+        section_deadline = None
+    stragglers = set()
+    excluded_providers = excluded_providers or set()
+    providers = [(fn, n) for fn, n in SEARCH_PROVIDERS if fn.__name__ not in excluded_providers]
+    tasks = [
+        search_section(section_id, section, topic, semaphore, section_deadline, stragglers, providers, use_corpus)
+        for section_id, section in enumerate(outline)
+    ]
     
     # This will be a list of lists of results
     all_results_list = await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Give stragglers a short grace window to report late, then cancel the rest
+    pending = {task for task in stragglers if not task.done()}
+    if pending:
+        _, pending = await asyncio.wait(pending, timeout=min(STRAGGLER_GRACE_SECONDS, section_deadline))
+    for task in pending:
+        task.cancel()
+    if stragglers:
+        await asyncio.gather(*stragglers, return_exceptions=True)
     
     # Flatten the final list of lists into a single list of results
     final_results = []
@@ -74,21 +334,39 @@ async def _run_concurrent_searches(outline: list, topic: str):
             
     return final_results
 
-def run_searcher_agent(outline: list, topic: str) -> list:
+def run_searcher_agent(outline: list, topic: str, section_deadline: float = None,
+                       excluded_providers: set = None, full_text_top_n: int = 0,
+                       use_corpus: bool = True) -> list:
     """
     Entry point for running the searcher agent.
+    If `section_deadline` is set, each section's search is capped at that many seconds.
+    Providers named in `excluded_providers` are not queried.
+    If `full_text_top_n` is set, the snippets of that many top results per section are
+    replaced by the full text of their pages.
+    If `use_corpus` is False, every section is searched live instead of being served from
+    the local corpus.
     """
     if not outline or not isinstance(outline, list):
         logging.error("Searcher agent received an invalid or empty outline.")
         return []
 
     logging.info(f"Searcher Agent starting research for {len(outline)} sections.")
+    metrics_before = get_search_metrics()
     try:
-        search_results = asyncio.run(_run_concurrent_searches(outline, topic))
+        search_results = asyncio.run(_run_concurrent_searches(
+            outline, topic, section_deadline, excluded_providers, use_corpus
+        ))
+        if search_results and full_text_top_n:
+            # Optional enrichment stage: richer context means fewer failed critiques and revisions
+            try:
+                search_results = asyncio.run(enrich_with_full_text(search_results, full_text_top_n))
+            except Exception as e:
+                logging.error(f"Full-text enrichment failed; keeping the search snippets: {e}")
         if not search_results:
              logging.warning("The search agent returned no results across all sources.")
         else:
              logging.info(f"Searcher agent finished with a total of {len(search_results)} results.")
+        _log_search_metrics(metrics_before)
         return search_results
     except Exception as e:
         logging.error(f"A critical error occurred in the searcher agent: {e}")
@@ -103,7 +381,7 @@ Here is a brief explanation of the role and purpose of each of the three functio
 * **Role:** The "Worker"
 * **Purpose:** This function does the actual searching for **one single section** of the report. It takes a section topic
     (e.g., "*A. Wave-Particle Duality*"), runs all the different searches (Tavily, arXiv, News, etc.) concurrently for that topic,
-    gathers the results, and tags each result with the original section name. This tagging is crucial so the writer agent knows
+    gathers the results, and tags each result with the section's index in the outline. This tagging is crucial so the writer agent knows
     which information belongs to which section.
 
 ### 2. `_run_concurrent_searches()`
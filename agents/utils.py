@@ -9,3 +9,23 @@ def clean_section_title(section_title: str) -> str:
     cleaned_title = re.sub(r'^[*\s\d\.\-]+', '', section_title).strip()
     return cleaned_title
 
+
+# Words that never change what a search provider returns for a query. Words that can carry
+# meaning ("a" in "Vitamin A", "it" for IT, "as", "and", "or", "vs") are deliberately absent.
+STOP_WORDS = frozenset({
+    "an", "are", "at", "be", "by", "for", "from", "in", "into", "is", "of", "on", "the", "to", "with",
+})
+
+# Runs of word characters, keeping symbols that are part of a term ("c++", "c#", "node.js", "covid-19")
+QUERY_TOKEN_PATTERN = re.compile(r'[\w+#]+(?:[.\-/][\w+#]+)*')
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a search query so trivially different queries compare equal.
+    Lowercases, drops punctuation around terms, removes stop words and collapses whitespace.
+    Stop words written in capitals are kept, as they are likely acronyms ("IN" for Indiana).
+    """
+    tokens = QUERY_TOKEN_PATTERN.findall(query)
+    return " ".join(
+        token.lower() for token in tokens if token.lower() not in STOP_WORDS or token.isupper()
+    )
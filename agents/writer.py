@@ -4,10 +4,11 @@ import logging
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.output_parsers import StrOutputParser
+from cassette import llm_boundary
 
 def get_writer_agent():
     """Initializes and returns the Writer Agent."""
-    llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0.0)
+    llm = llm_boundary("writer", lambda: ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0.0))
     
     prompt_template = """
 You are an expert technical writer. Your task is to write a detailed, well-structured, and informative report section on a specific topic using the provided context.
@@ -0,0 +1,194 @@
+# cassette.py
+
+import os
+import gzip
+import json
+import hashlib
+import logging
+import functools
+import contextvars
+import threading
+import uuid
+from datetime import datetime
+from collections import defaultdict, deque
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from tools.search_result import SearchResult
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# "off" (default), "record" or "replay"
+CASSETTE_MODE = os.environ.get("RESEARCH_CASSETTE_MODE", "off").lower()
+# Cassette to replay, or to record into (a new timestamped file per run if unset)
+CASSETTE_PATH = os.environ.get("RESEARCH_CASSETTE_PATH")
+CASSETTE_DIR = "cassettes"
+
+class Cassette:
+    """
+    The recorded or replayed I/O of a single run. Each run gets its own cassette, so
+    concurrent runs in one process (e.g. Streamlit sessions) never share a file or responses.
+    """
+
+    def __init__(self, mode: str, path: str = None):
+        self.mode = mode
+        self.path = None
+        self._lock = threading.Lock()
+        self._entries = defaultdict(deque)
+        self._writer = None
+        if mode == "record":
+            if not path:
+                os.makedirs(CASSETTE_DIR, exist_ok=True)
+                path = os.path.join(CASSETTE_DIR, f"run-{datetime.now():%Y%m%d-%H%M%S-%f}-{uuid.uuid4().hex[:8]}.jsonl.gz")
+            self.path = path
+            # One gzip stream per run, so entries compress against each other
+            self._writer = gzip.open(path, "wt", encoding="utf-8")
+            logging.info(f"Recording LLM and search I/O to cassette '{path}'.")
+        elif mode == "replay":
+            if not path or not os.path.exists(path):
+                raise FileNotFoundError(f"Cassette to replay not found: '{path}'")
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self._entries[entry["key"]].append(entry["response"])
+            self.path = path
+            logging.info(f"Replaying LLM and search I/O from cassette '{path}'.")
+
+    def record(self, key: str, kind: str, name: str, response):
+        line = json.dumps({"key": key, "kind": kind, "name": name, "response": response}, separators=(",", ":"))
+        with self._lock:
+            if self._writer is not None:
+                self._writer.write(line + "\n")
+
+    def replay(self, key: str, kind: str, name: str):
+        with self._lock:
+            responses = self._entries.get(key)
+            if not responses:
+                raise LookupError(f"No recorded {kind} response for '{name}' in cassette '{self.path}'.")
+            return responses.popleft()
+
+    def close(self):
+        """Closes the cassette being recorded, if any, flushing it to disk."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
+            logging.info(f"Cassette '{self.path}' written.")
+
+# The cassette of the run executing in the current context. LangGraph and asyncio copy
+# the context into the threads and tasks they start, so it follows the run everywhere.
+_current = contextvars.ContextVar("cassette", default=None)
+
+def _request_key(kind: str, name: str, request: str) -> str:
+    return hashlib.sha1(f"{kind}\n{name}\n{request}".encode("utf-8")).hexdigest()
+
+def start_run(mode: str = None, path: str = None):
+    """
+    Starts a cassette for a new run in the current context. In record mode every LLM and
+    search response is appended to a compact gzip JSON-lines file; in replay mode those
+    responses are served back in place of the network. Returns the cassette, or None when off.
+    """
+    finish_run()
+    mode = (mode or CASSETTE_MODE).lower()
+    current = Cassette(mode, path or CASSETTE_PATH) if mode in ("record", "replay") else None
+    _current.set(current)
+    return current
+
+def finish_run():
+    """Closes the current context's cassette, if any."""
+    current = _current.get()
+    if current is not None:
+        current.close()
+        _current.set(None)
+
+def is_active() -> bool:
+    """Returns True while the current run is recording or replaying."""
+    return _current.get() is not None
+
+def is_replaying() -> bool:
+    current = _current.get()
+    return current is not None and current.mode == "replay"
+
+def recorded_search(search_fn):
+    """Decorator that records or replays an async search tool's results."""
+    @functools.wraps(search_fn)
+    async def wrapper(query: str, max_results: int = None):
+        kwargs = {} if max_results is None else {"max_results": max_results}
+        current = _current.get()
+        if current is None:
+            return await search_fn(query, **kwargs)
+        name = search_fn.__name__
+        key = _request_key("search", name, json.dumps([query, max_results]))
+        if current.mode == "replay":
+            return [SearchResult.from_dict(item) for item in current.replay(key, "search", name)]
+        results = await search_fn(query, **kwargs)
+        current.record(key, "search", name, [result.to_dict() for result in results])
+        return results
+    return wrapper
+
+def recorded_fetch(fetch_fn):
+    """Decorator that records or replays an async page fetch `fetch_fn(client, url) -> str`."""
+    @functools.wraps(fetch_fn)
+    async def wrapper(client, url: str):
+        current = _current.get()
+        if current is None:
+            return await fetch_fn(client, url)
+        name = fetch_fn.__name__
+        key = _request_key("fetch", name, url)
+        if current.mode == "replay":
+            return current.replay(key, "fetch", name)
+        text = await fetch_fn(client, url)
+        current.record(key, "fetch", name, text)
+        return text
+    return wrapper
+
+def recorded_decision(name: str, request: str, decide):
+    """
+    Records or replays a JSON-serializable decision taken from the wall clock, such as an
+    SLA degradation, so a replay follows the same path as the recorded run.
+    """
+    current = _current.get()
+    if current is None:
+        return decide()
+    key = _request_key("decision", name, request)
+    if current.mode == "replay":
+        return current.replay(key, "decision", name)
+    decision = decide()
+    current.record(key, "decision", name, decision)
+    return decision
+
+def llm_boundary(name: str, make_llm, output_type=None):
+    """
+    Returns a runnable standing in for an LLM (or structured-output LLM) built by `make_llm`.
+    The LLM is only constructed when a live call is needed, so replay runs need no API key.
+
+    Args:
+        name (str): Name of the calling agent, used to key recorded responses.
+        make_llm: Zero-argument callable returning the runnable to call live.
+        output_type: Pydantic model returned by structured output, or None for chat messages.
+    """
+    llm = None
+
+    def invoke(prompt_value):
+        nonlocal llm
+        current = _current.get()
+        key = _request_key("llm", name, prompt_value.to_string())
+        if current is not None and current.mode == "replay":
+            response = current.replay(key, "llm", name)
+            if output_type:
+                return output_type.parse_obj(response) if response is not None else None
+            return AIMessage(content=response)
+        if llm is None:
+            llm = make_llm()
+        result = llm.invoke(prompt_value)
+        if current is not None:
+            if output_type:
+                response = result.dict() if result is not None else None
+            else:
+                response = result.content
+            current.record(key, "llm", name, response)
+        return result
+
+    return RunnableLambda(invoke)
@@ -4,13 +4,17 @@ import logging
 import time # Import the time module for our delay
 from typing import TypedDict, List, Dict
 from langgraph.graph import StateGraph, END
+import sla
+import cassette
+from section_cache import SectionCache, fingerprint
 
 # Import agent runners
-from agents.planner import get_planner_agent, run_planner_agent
-from agents.searcher import run_searcher_agent
+from agents.planner import get_planner_agent, run_planner_agent, outline_leaves, OutlineNode
+from agents.searcher import run_searcher_agent, get_slow_providers, SEARCH_CONCURRENCY
 from agents.writer import get_writer_agent
-from agents.editor import get_editor_agent, run_editor_agent
-from agents.critiquer import get_critiquer_agent, Critique
+from agents.editor import get_editor_agent, run_editor_agent, assemble_report_sections
+from agents.critiquer import get_critiquer_agent, get_batch_critiquer_agent, run_batch_critique, Critique
+from tools.search_result import SearchResult
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -18,8 +22,11 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # --- Define the state for our graph ---
 class GraphState(TypedDict):
     topic: str
-    outline: List[str]
-    search_results: List[Dict]
+    outline_tree: List[OutlineNode]
+    outline: List[str]  # Leaf subsection titles only; these are searched and written
+    search_results: List[SearchResult]
+    search_deadline: float  # Optional per-section search budget in seconds
+    full_text_top_n: int  # Optional number of top sources per section to fetch in full
     sections: List[str]
     completed_sections: List[str]
     report: str
@@ -27,6 +34,27 @@ class GraphState(TypedDict):
     critique: Critique
     revision_number: int
     current_section_index: int
+    # Latency SLA mode (see sla.py); set in the initial state by sla.start_run
+    run_deadline: float
+    section_started_at: float
+    section_durations: List[float]
+    degradation_level: int
+    degradations: List[str]
+    # Incremental mode: reuse approved sections whose outline entry and context are unchanged
+    incremental: bool
+    section_fingerprints: List[str]
+    cached_sections: Dict[int, str]
+    # Batched mode: critique_batch_size sections are written in parallel and critiqued in one call
+    critique_batch_size: int
+    batch_indices: List[int]
+    batch_drafts: Dict[int, str]
+    batch_critiques: Dict[int, Critique]
+    batch_revisions: Dict[int, int]
+    batch_approved: List[int]
+
+def build_section_context(search_results: List[SearchResult], section_id: int) -> str:
+    """Joins the context blocks of all search results tagged with the given section."""
+    return "\n\n---\n\n".join(res.context_text for res in search_results if res.section_id == section_id)
 
 # --- Agent Nodes ---
 
@@ -34,19 +62,72 @@ def planner_node(state: GraphState):
     logging.info("Executing Planner Node")
     topic = state.get("topic")
     planner_agent = get_planner_agent()
-    outline = run_planner_agent(planner_agent, topic)
+    outline_tree = run_planner_agent(planner_agent, topic)
     return {
-        "outline": outline,
+        "outline_tree": outline_tree,
+        "outline": [leaf.title for leaf in outline_leaves(outline_tree)],
         "current_section_index": 0,
-        "completed_sections": []
+        "completed_sections": [],
     }
 
 def search_node(state: GraphState):
     logging.info("Executing Search Node")
     topic = state.get("topic")
     outline = state.get("outline")
-    search_results = run_searcher_agent(outline, topic)
-    return {"search_results": search_results}
+    section_deadline = state.get("search_deadline")
+    degradations = list(state.get("degradations") or [])
+    excluded_providers = set()
+
+    # Under a run deadline, keep the search stage within its share of the budget.
+    # The decision depends on the clock, so cassettes record it and replays reuse it.
+    def cap_search_stage():
+        sla_deadline = sla.section_search_deadline(state, len(outline), SEARCH_CONCURRENCY)
+        if sla_deadline is None or (section_deadline is not None and sla_deadline >= section_deadline):
+            return None
+        return {"deadline": sla_deadline, "excluded_providers": sorted(get_slow_providers(sla_deadline))}
+
+    search_cap = None
+    if state.get("run_deadline") is not None:
+        search_cap = cassette.recorded_decision("sla_search", str(len(outline)), cap_search_stage)
+    if search_cap is not None:
+        # The searcher ignores deadlines while a cassette is active, so the cap is only
+        # applied, and reported, outside of recording and replay
+        if not cassette.is_active():
+            section_deadline = search_cap["deadline"]
+            degradations.append(f"search_deadline: capped at {section_deadline:.0f}s per section")
+        excluded_providers = set(search_cap["excluded_providers"])
+        if excluded_providers:
+            degradations.append(f"drop_slow_providers: {', '.join(sorted(excluded_providers))}")
+
+    # Incremental mode detects changed sources, so it must see live results rather than
+    # the corpus' copy of the last run's results
+    search_results = run_searcher_agent(
+        outline, topic, section_deadline, excluded_providers, state.get("full_text_top_n") or 0,
+        use_corpus=not state.get("incremental"),
+    )
+    updates = {
+        "search_results": search_results,
+        "section_started_at": time.time(),
+        "degradations": degradations,
+    }
+
+    if state.get("incremental"):
+        section_fingerprints = [
+            fingerprint(title, build_section_context(search_results, section_id))
+            for section_id, title in enumerate(outline)
+        ]
+        cache = SectionCache(topic)
+        cached_sections = {}
+        for section_id, title in enumerate(outline):
+            content = cache.get_section(title, section_fingerprints[section_id])
+            if content is not None:
+                cached_sections[section_id] = content
+        logging.info(f"Incremental mode: reusing {len(cached_sections)}/{len(outline)} unchanged sections.")
+        updates["section_fingerprints"] = section_fingerprints
+        updates["cached_sections"] = cached_sections
+
+    updates.update(sla.escalate_if_needed({**state, **updates}))
+    return updates
 
 def write_node(state: GraphState):
     search_results = state.get("search_results")
@@ -59,10 +140,7 @@ def write_node(state: GraphState):
     logging.info(f"Writing section: '{current_section_topic}' (Revision #{revision_number})")
 
     writer_agent = get_writer_agent()
-    section_context = "\n\n---\n\n".join([
-        f"**Source:** {res.get('url', 'N/A')}\n**Content:** {res.get('summary', 'N/A')}"
-        for res in search_results if res.get('section') == current_section_topic
-    ])
+    section_context = build_section_context(search_results, current_section_index)
     
     section_content_result = writer_agent.invoke({
         "section_topic": current_section_topic,
@@ -83,10 +161,7 @@ def critique_node(state: GraphState):
     written_section = state.get("sections")[0]
 
     current_section_topic = outline[current_section_index]
-    section_context = "\n\n---\n\n".join([
-        f"**Source:** {res.get('url', 'N/A')}\n**Content:** {res.get('summary', 'N/A')}"
-        for res in search_results if res.get('section') == current_section_topic
-    ])
+    section_context = build_section_context(search_results, current_section_index)
 
     critiquer_agent = get_critiquer_agent()
     critique_result = critiquer_agent.invoke({
@@ -104,25 +179,165 @@ def save_section_and_continue_node(state: GraphState):
     current_section_index = state.get("current_section_index")
 
     completed_sections.append(approved_section)
+    _cache_approved_section(state, current_section_index, approved_section, state.get("critique"))
     
     # THE FIX: Add a polite delay to avoid hitting Gemini API rate limits
     logging.info("Pausing for 3 seconds before starting next section...")
     time.sleep(3)
 
-    return {
+    now = time.time()
+    updates = {
         "completed_sections": completed_sections,
         "current_section_index": current_section_index + 1,
         "critique": None,
         "revision_number": 0,
+        "section_started_at": now,
+        "section_durations": (state.get("section_durations") or []) + [now - state.get("section_started_at", now)],
+    }
+    updates.update(sla.escalate_if_needed({**state, **updates}))
+    return updates
+
+def _cache_approved_section(state: GraphState, section_id: int, content: str, critique: Critique):
+    # Only sections that actually passed critique are worth reusing on a later run
+    if state.get("incremental") and critique is not None and critique.score >= sla.PASS_SCORE:
+        SectionCache(state.get("topic")).put_section(
+            state.get("outline")[section_id],
+            state.get("section_fingerprints")[section_id],
+            content,
+        )
+
+def batch_write_node(state: GraphState):
+    outline = state.get("outline")
+    search_results = state.get("search_results")
+    batch_indices = state.get("batch_indices") or []
+
+    # Start a new batch of consecutive sections; cached sections are left to reuse_section
+    if not batch_indices:
+        cached_sections = state.get("cached_sections") or {}
+        section_id = state.get("current_section_index")
+        while (section_id < len(outline) and section_id not in cached_sections
+               and len(batch_indices) < state.get("critique_batch_size")):
+            batch_indices.append(section_id)
+            section_id += 1
+        batch_drafts, batch_critiques, batch_revisions, batch_approved = {}, {}, {}, []
+    else:
+        batch_drafts = dict(state.get("batch_drafts"))
+        batch_critiques = state.get("batch_critiques")
+        batch_revisions = dict(state.get("batch_revisions"))
+        batch_approved = state.get("batch_approved")
+
+    pending = [section_id for section_id in batch_indices if section_id not in batch_approved]
+    logging.info(f"Writing {len(pending)} sections in parallel: {[outline[i] for i in pending]}")
+
+    writer_agent = get_writer_agent()
+    drafts = writer_agent.batch(
+        [{
+            "section_topic": outline[section_id],
+            "context": build_section_context(search_results, section_id),
+            "critique": batch_critiques[section_id].critique if section_id in batch_critiques else "N/A",
+        } for section_id in pending],
+        config={"max_concurrency": len(pending)},
+    )
+    for section_id, draft in zip(pending, drafts):
+        batch_drafts[section_id] = draft
+        batch_revisions[section_id] = batch_revisions.get(section_id, 0) + 1
+
+    return {
+        "batch_indices": batch_indices,
+        "batch_drafts": batch_drafts,
+        "batch_critiques": batch_critiques,
+        "batch_revisions": batch_revisions,
+        "batch_approved": batch_approved,
+    }
+
+def batch_critique_node(state: GraphState):
+    logging.info("Executing Batch Critique Node")
+    outline = state.get("outline")
+    search_results = state.get("search_results")
+    batch_drafts = state.get("batch_drafts")
+    batch_revisions = state.get("batch_revisions")
+    batch_approved = list(state.get("batch_approved"))
+    batch_critiques = dict(state.get("batch_critiques"))
+
+    pending = [section_id for section_id in state.get("batch_indices") if section_id not in batch_approved]
+    critiques = run_batch_critique(
+        get_batch_critiquer_agent(),
+        get_critiquer_agent(),
+        [{
+            "topic": outline[section_id],
+            "section": batch_drafts[section_id],
+            "context": build_section_context(search_results, section_id),
+        } for section_id in pending],
+    )
+    for section_id, critique in zip(pending, critiques):
+        logging.info(f"Critique for '{outline[section_id]}': Score {critique.score}, Feedback: '{critique.critique}'")
+        batch_critiques[section_id] = critique
+        # Failed sections go back to their own writer loop until they pass or run out of revisions
+        if critique.score >= sla.pass_score(state) or batch_revisions[section_id] > sla.max_revisions(state):
+            batch_approved.append(section_id)
+
+    return {"batch_critiques": batch_critiques, "batch_approved": batch_approved}
+
+def save_batch_node(state: GraphState):
+    batch_indices = state.get("batch_indices")
+    logging.info(f"Saving {len(batch_indices)} approved sections.")
+    completed_sections = state.get("completed_sections")
+    batch_critiques = state.get("batch_critiques")
+
+    for section_id in batch_indices:
+        draft = state.get("batch_drafts")[section_id]
+        completed_sections.append(draft)
+        _cache_approved_section(state, section_id, draft, batch_critiques.get(section_id))
+
+    # THE FIX: Add a polite delay to avoid hitting Gemini API rate limits
+    logging.info("Pausing for 3 seconds before starting next batch...")
+    time.sleep(3)
+
+    now = time.time()
+    per_section = (now - state.get("section_started_at", now)) / len(batch_indices)
+    updates = {
+        "completed_sections": completed_sections,
+        "current_section_index": state.get("current_section_index") + len(batch_indices),
+        "batch_indices": [],
+        "section_started_at": now,
+        "section_durations": (state.get("section_durations") or []) + [per_section] * len(batch_indices),
+    }
+    updates.update(sla.escalate_if_needed({**state, **updates}))
+    return updates
+
+def reuse_section_node(state: GraphState):
+    current_section_index = state.get("current_section_index")
+    logging.info(f"Reusing unchanged section: '{state.get('outline')[current_section_index]}'")
+    completed_sections = state.get("completed_sections")
+    completed_sections.append(state.get("cached_sections")[current_section_index])
+    return {
+        "completed_sections": completed_sections,
+        "current_section_index": current_section_index + 1,
+        "section_started_at": time.time(),
     }
 
 def editor_node(state: GraphState):
     logging.info("Executing Editor Node")
     topic = state.get("topic")
     completed_sections = state.get("completed_sections")
-    editor_agent = get_editor_agent()
-    report = run_editor_agent(editor_agent, topic, completed_sections)
-    return {"report": report}
+    report_sections = assemble_report_sections(state.get("outline_tree"), completed_sections)
+
+    # The editor polishes the whole document in one call, so it can only be skipped
+    # when every section is identical to the last run's
+    cache = SectionCache(topic) if state.get("incremental") else None
+    sections_fingerprint = fingerprint(*report_sections)
+    report = cache.get_report(sections_fingerprint) if cache else None
+    if report is not None:
+        logging.info("Incremental mode: no section changed; reusing the previously edited report.")
+    else:
+        editor_agent = get_editor_agent()
+        report = run_editor_agent(editor_agent, topic, report_sections)
+        if cache and not report.startswith("Error:"):
+            cache.put_report(sections_fingerprint, report)
+    degradations = state.get("degradations") or []
+    if degradations:
+        logging.info(f"Report delivered with SLA degradations: {degradations}")
+    return {"report": report, "degradations": degradations}
 
 # --- Conditional Edge Functions ---
 
@@ -132,14 +347,38 @@ def route_to_write_or_edit(state: GraphState):
     if current_section_index >= len(outline):
         logging.info("All sections have been written and approved. Proceeding to editor.")
         return "editor"
+    elif current_section_index in (state.get("cached_sections") or {}):
+        return "reuse"
+    elif state.get("critique_batch_size"):
+        return "batch_writer"
     else:
         logging.info(f"Proceeding to write section {current_section_index + 1}/{len(outline)}.")
         return "writer"
 
+def route_to_critique_or_save(state: GraphState):
+    if sla.skip_critique(state):
+        logging.info("Latency SLA: skipping critique for this section.")
+        return "save_and_continue"
+    return "critiquer"
+
+def route_batch_to_critique_or_save(state: GraphState):
+    if sla.skip_critique(state):
+        logging.info("Latency SLA: skipping critique for this batch.")
+        return "save_batch"
+    return "batch_critiquer"
+
+def route_batch_to_rewrite_or_save(state: GraphState):
+    batch_approved = state.get("batch_approved")
+    if all(section_id in batch_approved for section_id in state.get("batch_indices")):
+        logging.info("All sections in the batch passed critique or reached max revisions. Saving batch.")
+        return "save_batch"
+    logging.info("Some sections in the batch failed critique. Looping back to writer for revision.")
+    return "batch_writer"
+
 def route_to_rewrite_or_save(state: GraphState):
     critique = state.get("critique")
     revision_number = state.get("revision_number", 0)
-    if critique.score >= 8 or revision_number > 2:
+    if critique.score >= sla.pass_score(state) or revision_number > sla.max_revisions(state):
         logging.info("Critique passed or max revisions reached. Saving section.")
         return "save_and_continue"
     else:
@@ -156,6 +395,10 @@ def build_graph():
     workflow.add_node("writer", write_node)
     workflow.add_node("critiquer", critique_node)
     workflow.add_node("save_section_and_continue", save_section_and_continue_node)
+    workflow.add_node("reuse_section", reuse_section_node)
+    workflow.add_node("batch_writer", batch_write_node)
+    workflow.add_node("batch_critiquer", batch_critique_node)
+    workflow.add_node("save_batch", save_batch_node)
     workflow.add_node("editor", editor_node)
 
     workflow.set_entry_point("planner")
@@ -164,10 +407,14 @@ def build_graph():
     workflow.add_conditional_edges(
         "searcher",
         route_to_write_or_edit,
-        {"writer": "writer", "editor": "editor"}
+        {"writer": "writer", "batch_writer": "batch_writer", "reuse": "reuse_section", "editor": "editor"}
     )
     
-    workflow.add_edge("writer", "critiquer")
+    workflow.add_conditional_edges(
+        "writer",
+        route_to_critique_or_save,
+        {"critiquer": "critiquer", "save_and_continue": "save_section_and_continue"}
+    )
     
     workflow.add_conditional_edges(
         "critiquer",
@@ -178,7 +425,31 @@ def build_graph():
     workflow.add_conditional_edges(
         "save_section_and_continue",
         route_to_write_or_edit,
-        {"writer": "writer", "editor": "editor"}
+        {"writer": "writer", "batch_writer": "batch_writer", "reuse": "reuse_section", "editor": "editor"}
+    )
+
+    workflow.add_conditional_edges(
+        "reuse_section",
+        route_to_write_or_edit,
+        {"writer": "writer", "batch_writer": "batch_writer", "reuse": "reuse_section", "editor": "editor"}
+    )
+
+    workflow.add_conditional_edges(
+        "batch_writer",
+        route_batch_to_critique_or_save,
+        {"batch_critiquer": "batch_critiquer", "save_batch": "save_batch"}
+    )
+
+    workflow.add_conditional_edges(
+        "batch_critiquer",
+        route_batch_to_rewrite_or_save,
+        {"batch_writer": "batch_writer", "save_batch": "save_batch"}
+    )
+
+    workflow.add_conditional_edges(
+        "save_batch",
+        route_to_write_or_edit,
+        {"writer": "writer", "batch_writer": "batch_writer", "reuse": "reuse_section", "editor": "editor"}
     )
 
     workflow.add_edge("editor", END)
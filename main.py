@@ -1,5 +1,7 @@
 import streamlit as st
 import logging
+import cassette
+import sla
 from graph import build_graph
 
 # Configure logging
@@ -18,6 +20,26 @@ def main():
 
     # User input
     topic = st.text_input("Enter the research topic:", placeholder="e.g., The future of gene editing with CRISPR")
+    search_deadline = st.number_input(
+        "Search deadline per section in seconds (0 = wait for every source):", min_value=0, value=0,
+        help="Each section proceeds with the sources that have answered when its deadline passes."
+    )
+    time_budget_minutes = st.number_input(
+        "Time budget in minutes (0 = unlimited):", min_value=0, value=0,
+        help="The agents degrade gracefully (fewer revisions, lighter critique) to deliver within this time."
+    )
+    critique_batch_size = st.number_input(
+        "Sections per batch (0 = one at a time):", min_value=0, max_value=10, value=0,
+        help="Writes this many sections in parallel and critiques them in a single LLM call, saving request quota."
+    )
+    full_text_top_n = st.number_input(
+        "Full-text sources per section (0 = snippets only):", min_value=0, max_value=10, value=0,
+        help="Fetches the full page text of the top-ranked sources for each section to give the writer richer context."
+    )
+    incremental = st.checkbox(
+        "Incremental refresh",
+        help="Reuse approved sections from the last run of this topic when their sources have not changed."
+    )
 
     if st.button("Generate Report"):
         if not topic:
@@ -27,11 +49,23 @@ def main():
         try:
             with st.spinner("The agents are at work... This may take a few minutes."):
                 
+                # Start a fresh cassette (a no-op unless RESEARCH_CASSETTE_MODE is set)
+                cassette.start_run()
+
                 # Build the graph
                 app = build_graph()
 
                 # Initial state for the graph
-                initial_state = {"topic": topic, "error": None}
+                initial_state = {
+                    "topic": topic,
+                    "error": None,
+                    "search_deadline": search_deadline or None,
+                    # Starts the SLA clock now, so the budget covers the planner too
+                    **sla.start_run(time_budget_minutes * 60),
+                    "incremental": incremental,
+                    "critique_batch_size": critique_batch_size,
+                    "full_text_top_n": full_text_top_n,
+                }
 
                 st.write("---")
                 st.write("### Agent Workflow Log:")
@@ -55,10 +89,14 @@ def main():
                             st.text("Generated Outline...")
                         if "search_results" in agent_output:
                             st.text("Completed Research...")
-                        if "sections" in agent_output:
+                        if "sections" in agent_output or "batch_drafts" in agent_output:
                              st.text("Finished Writing Sections...")
                         if "report" in agent_output:
                             st.text("Final Report Assembled.")
+                            if agent_output.get("degradations"):
+                                st.warning("Applied to meet the time budget:\n\n" + "\n".join(
+                                    f"* {degradation}" for degradation in agent_output["degradations"]
+                                ))
 
                         final_state = value
 
@@ -76,6 +114,8 @@ def main():
         except Exception as e:
             st.error(f"An unexpected error occurred: {e}")
             logging.error("An unexpected error occurred in the Streamlit app", exc_info=True)
+        finally:
+            cassette.finish_run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,63 @@
+# section_cache.py
+
+import os
+import json
+import hashlib
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+SECTION_CACHE_DIR = os.environ.get("RESEARCH_SECTION_CACHE_DIR", ".section_cache")
+
+def fingerprint(*parts: str) -> str:
+    """Returns a stable fingerprint of the given text parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+class SectionCache:
+    """
+    Approved sections from earlier runs of a topic, keyed by section title and stored with
+    a fingerprint of the outline entry and search context they were written from.
+    Also remembers the edited report for a given set of sections.
+    """
+
+    def __init__(self, topic: str, directory: str = SECTION_CACHE_DIR):
+        # Keyed by the exact topic (up to whitespace); looser matching could merge distinct topics
+        self.path = os.path.join(directory, f"{fingerprint(' '.join(topic.split()))[:32]}.json")
+        self._data = {"topic": topic, "sections": {}, "reports": {}}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable section cache '{self.path}': {e}")
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f)
+        os.replace(tmp_path, self.path)
+
+    def get_section(self, title: str, section_fingerprint: str):
+        """Returns the approved section text if it was written from identical inputs, else None."""
+        entry = self._data["sections"].get(title)
+        if entry and entry.get("fingerprint") == section_fingerprint:
+            return entry.get("content")
+        return None
+
+    def put_section(self, title: str, section_fingerprint: str, content: str):
+        self._data["sections"][title] = {"fingerprint": section_fingerprint, "content": content}
+        self._save()
+
+    def get_report(self, sections_fingerprint: str):
+        """Returns the edited report previously produced from identical sections, else None."""
+        return self._data["reports"].get(sections_fingerprint)
+
+    def put_report(self, sections_fingerprint: str, report: str):
+        # Only the latest report is worth keeping
+        self._data["reports"] = {sections_fingerprint: report}
+        self._save()
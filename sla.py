@@ -0,0 +1,92 @@
+# sla.py
+
+import math
+import time
+import logging
+import cassette
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Share of the remaining run budget the search stage may spend
+SEARCH_SHARE = 0.3
+MIN_SECTION_SEARCH_SECONDS = 5.0
+# Estimates used until real timings are available
+DEFAULT_SECTION_SECONDS = 30.0
+EDITOR_SECONDS = 30.0
+
+# Degradations in the order they are applied when the run is projected to miss its deadline
+DEGRADATION_STEPS = ["cap_revisions", "lower_critique_threshold", "skip_critique"]
+MAX_REVISIONS = 2
+CAPPED_MAX_REVISIONS = 1
+PASS_SCORE = 8
+LOWERED_PASS_SCORE = 6
+
+def start_run(time_budget: float) -> dict:
+    """
+    Returns the initial SLA state for a run with the given wall-clock budget in seconds, if any.
+    Merge it into the graph's initial state so the budget covers the whole run, planner included.
+    """
+    if not time_budget:
+        return {"run_deadline": None, "degradation_level": 0, "degradations": [], "section_durations": []}
+    logging.info(f"Latency SLA mode: the report must be delivered within {time_budget:.0f}s.")
+    return {"run_deadline": time.time() + time_budget, "degradation_level": 0, "degradations": [], "section_durations": []}
+
+def remaining_seconds(state: dict):
+    """Seconds left before the run deadline, or None when no deadline is set."""
+    run_deadline = state.get("run_deadline")
+    return None if run_deadline is None else run_deadline - time.time()
+
+def section_search_deadline(state: dict, section_count: int, concurrency: int):
+    """
+    Returns the per-section search deadline that keeps the search stage within its share
+    of the remaining budget, given that `concurrency` sections are searched at a time.
+    """
+    remaining = remaining_seconds(state)
+    if remaining is None or section_count == 0:
+        return None
+    waves = math.ceil(section_count / concurrency)
+    return max(MIN_SECTION_SEARCH_SECONDS, remaining * SEARCH_SHARE / waves)
+
+def projected_seconds(state: dict) -> float:
+    """Projects the time still needed to write the remaining sections and run the editor."""
+    durations = state.get("section_durations") or []
+    per_section = sum(durations) / len(durations) if durations else DEFAULT_SECTION_SECONDS
+    sections_left = len(state.get("outline") or []) - state.get("current_section_index", 0)
+    return max(sections_left, 0) * per_section + EDITOR_SECONDS
+
+def escalate_if_needed(state: dict) -> dict:
+    """
+    Applies the next degradation step if the projected finish time exceeds the remaining budget.
+    Steps are applied one at a time, so later sections are timed under the new setting
+    before escalating further. Cassettes record each decision, so replays degrade identically.
+    Returns the state updates, if any.
+    """
+    level = state.get("degradation_level", 0)
+    if state.get("run_deadline") is None or level >= len(DEGRADATION_STEPS):
+        return {}
+
+    def decide():
+        remaining = remaining_seconds(state)
+        projected = projected_seconds(state)
+        if projected <= remaining:
+            return None
+        return f"{DEGRADATION_STEPS[level]}: projected {projected:.0f}s of work with {remaining:.0f}s left"
+
+    request = f"{state.get('current_section_index', 0)}:{level}"
+    record = cassette.recorded_decision("sla_escalate", request, decide)
+    if record is None:
+        return {}
+    logging.warning(f"Latency SLA: applying degradation '{record}'.")
+    return {
+        "degradation_level": level + 1,
+        "degradations": (state.get("degradations") or []) + [record],
+    }
+
+def max_revisions(state: dict) -> int:
+    return CAPPED_MAX_REVISIONS if state.get("degradation_level", 0) >= 1 else MAX_REVISIONS
+
+def pass_score(state: dict) -> int:
+    return LOWERED_PASS_SCORE if state.get("degradation_level", 0) >= 2 else PASS_SCORE
+
+def skip_critique(state: dict) -> bool:
+    return state.get("degradation_level", 0) >= 3
@@ -0,0 +1,23 @@
+from agents.utils import normalize_query
+
+
+def test_trivial_differences_compare_equal():
+    assert normalize_query("The Rise of Rust in 2024") == normalize_query("rise  of rust, in 2024")
+    assert normalize_query("Quantum Computing: Error Correction") == normalize_query("quantum computing error correction")
+
+
+def test_symbols_inside_terms_are_kept():
+    assert normalize_query("IT security in C++") != normalize_query("it security in c")
+    assert normalize_query("C# vs F#") == "c# vs f#"
+    assert normalize_query("Node.js and COVID-19") == "node.js and covid-19"
+
+
+def test_meaningful_short_words_are_kept():
+    assert normalize_query("Vitamin A and D") == "vitamin a and d"
+    assert normalize_query("Vitamin A and D") != normalize_query("vitamin d")
+    assert normalize_query("cats or dogs") != normalize_query("cats and dogs")
+
+
+def test_capitalized_stop_words_are_kept_as_acronyms():
+    assert normalize_query("Flights to IN") == "flights in"
+    assert normalize_query("Flights to in") == "flights"
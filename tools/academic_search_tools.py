@@ -4,6 +4,8 @@ import asyncio
 import logging
 import httpx
 from dotenv import load_dotenv
+from cassette import recorded_search
+from tools.search_result import SearchResult
 import os
 
 load_dotenv()
@@ -12,6 +14,7 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 SEMANTIC_SCHOLAR_API_KEY = os.environ.get("SEMANTIC_SCHOLAR_API_KEY")
 semantic_scholar_lock = asyncio.Lock()
 
+@recorded_search
 async def search_arxiv(query: str, max_results: int = 3) -> list:
     """Asynchronously searches arXiv for a given query."""
     # ArXiv is not very sensitive, a small delay is fine.
@@ -23,7 +26,7 @@ async def search_arxiv(query: str, max_results: int = 3) -> list:
         results = await loop.run_in_executor(None, arxiv_tool.run, query)
         
         if "Published" not in results:
-             return [{"title": "No relevant articles found on arXiv", "summary": results, "url": "", "source": "arXiv"}]
+             return [SearchResult(title="No relevant articles found on arXiv", summary=results, url="", source="arXiv")]
         
         entries = results.split('Published: ')
         formatted_results = []
@@ -35,12 +38,12 @@ async def search_arxiv(query: str, max_results: int = 3) -> list:
             title_part = parts[1].split('\nAuthors: ')[0].strip()
             summary_part = entry.split('\nSummary: ')[1].strip() if '\nSummary: ' in entry else 'No summary available.'
             
-            formatted_results.append({
-                "title": title_part,
-                "summary": summary_part,
-                "url": url_part,
-                "source": "arXiv"
-            })
+            formatted_results.append(SearchResult(
+                title=title_part,
+                summary=summary_part,
+                url=url_part,
+                source="arXiv"
+            ))
         logging.info(f"ArXiv search for '{query}' returned {len(formatted_results)} results.")
         return formatted_results
     except Exception as e:
@@ -49,6 +52,7 @@ async def search_arxiv(query: str, max_results: int = 3) -> list:
 
 
 
+@recorded_search
 async def search_semantic_scholar(query: str, max_results: int = 3) -> list:
     """Asynchronously searches Semantic Scholar for a given query using an API key."""
     # 1. Check if the API key exists
@@ -76,12 +80,12 @@ async def search_semantic_scholar(query: str, max_results: int = 3) -> list:
                 data = response.json()
                 results = data.get('data', [])
                 logging.info(f"Semantic Scholar search for '{query}' returned {len(results)} results.")
-                return [{
-                    "title": item.get('title'), 
-                    "summary": item.get('abstract'),
-                    "url": item.get('url'),
-                    "source": "Semantic Scholar"
-                } for item in results]
+                return [SearchResult(
+                    title=item.get('title'),
+                    summary=item.get('abstract'),
+                    url=item.get('url'),
+                    source="Semantic Scholar"
+                ) for item in results]
             except httpx.HTTPStatusError as e:
                 logging.error(f"HTTP error during Semantic Scholar search: {e.response.status_code}")
                 return []
@@ -0,0 +1,179 @@
+# corpus_index.py
+
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+import numpy as np
+from tools.search_result import SearchResult
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+CORPUS_DIR = os.environ.get("RESEARCH_CORPUS_DIR", ".corpus")
+EMBEDDING_DIM = 512
+
+def embed_text(text: str) -> np.ndarray:
+    """
+    Embeds text locally on the CPU using hashed word unigrams and character trigrams.
+    Returns an L2-normalized float32 vector of length EMBEDDING_DIM.
+    """
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    words = re.findall(r'\w+', (text or "").lower())
+    features = list(words)
+    for word in words:
+        padded = f" {word} "
+        features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % EMBEDDING_DIM
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[bucket] += sign
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+class CorpusIndex:
+    """
+    A persistent, append-only index of every search result fetched so far.
+    Embeddings are stored as a raw float32 matrix that is memory-mapped for search,
+    alongside a JSON-lines file holding the matching result records, each with the
+    report topic it was fetched for and when it was fetched.
+    """
+
+    def __init__(self, directory: str = CORPUS_DIR):
+        self.directory = directory
+        self.embeddings_path = os.path.join(directory, "embeddings.f32")
+        self.records_path = os.path.join(directory, "records.jsonl")
+        self._lock = threading.Lock()
+        self._records = []
+        self._topics = []      # The report topic each record was fetched for, in row order
+        self._fetched_at = []  # Unix time each record was fetched, in row order
+        self._topic_vectors = {}
+        self._keys = set()
+        self._matrix = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.records_path):
+            return
+        with open(self.records_path, "r", encoding="utf-8") as f:
+            lines = [line for line in f if line.strip()]
+        row_bytes = EMBEDDING_DIM * 4
+        rows = os.path.getsize(self.embeddings_path) // row_bytes if os.path.exists(self.embeddings_path) else 0
+
+        # A previous write may have been interrupted between the two files; trim both
+        # to the rows they have in common so embeddings and records stay aligned
+        rows = min(rows, len(lines))
+        if os.path.exists(self.embeddings_path) and os.path.getsize(self.embeddings_path) != rows * row_bytes:
+            logging.warning(f"Trimming corpus embeddings to {rows} rows after an interrupted write.")
+            os.truncate(self.embeddings_path, rows * row_bytes)
+        if len(lines) != rows:
+            logging.warning(f"Trimming corpus records to {rows} rows after an interrupted write.")
+            lines = lines[:rows]
+            with open(self.records_path, "w", encoding="utf-8") as f:
+                f.writelines(lines)
+
+        entries = [json.loads(line) for line in lines]
+        self._records = [SearchResult.from_dict(entry) for entry in entries]
+        self._topics = [entry.get("topic") for entry in entries]
+        # Records written before fetch times were stored count as stale
+        self._fetched_at = [entry.get("fetched_at", 0.0) for entry in entries]
+        self._keys = {self._record_key(record) for record in self._records}
+        logging.info(f"Loaded local corpus index with {len(self._records)} results from '{self.directory}'.")
+
+    @staticmethod
+    def _record_key(record: SearchResult) -> str:
+        return hashlib.sha1(f"{record.url}\n{record.summary}".encode("utf-8")).hexdigest()
+
+    def _mapped_matrix(self):
+        """Returns the embedding matrix memory-mapped from disk, remapping after appends."""
+        if not self._records:
+            return None
+        if self._matrix is None or self._matrix.shape[0] != len(self._records):
+            self._matrix = np.memmap(self.embeddings_path, dtype=np.float32, mode="r",
+                                     shape=(len(self._records), EMBEDDING_DIM))
+        return self._matrix
+
+    def add(self, results: list, topic: str = None) -> int:
+        """
+        Indexes new search results, skipping duplicates and empty placeholders.
+        `topic` is the report topic the results were fetched for. Returns the number added.
+        """
+        new_records = []
+        with self._lock:
+            for res in results:
+                if not isinstance(res, SearchResult) or not res.url or not res.summary:
+                    continue
+                # Drop the section tag; stored results belong to no particular outline
+                record = res.with_section(None) if res.section_id is not None else res
+                key = self._record_key(record)
+                if key in self._keys:
+                    continue
+                self._keys.add(key)
+                new_records.append(record)
+            if not new_records:
+                return 0
+
+            fetched_at = time.time()
+            vectors = np.stack([embed_text(f"{r.title or ''} {r.summary}") for r in new_records])
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.embeddings_path, "ab") as f:
+                f.write(vectors.astype(np.float32).tobytes())
+            with open(self.records_path, "a", encoding="utf-8") as f:
+                for record in new_records:
+                    f.write(json.dumps({**record.to_dict(), "topic": topic, "fetched_at": fetched_at}) + "\n")
+            self._records.extend(new_records)
+            self._topics.extend([topic] * len(new_records))
+            self._fetched_at.extend([fetched_at] * len(new_records))
+        return len(new_records)
+
+    def _topic_vector(self, topic: str) -> np.ndarray:
+        if topic not in self._topic_vectors:
+            self._topic_vectors[topic] = embed_text(topic)
+        return self._topic_vectors[topic]
+
+    def search(self, query: str, topic: str, k: int, min_score: float,
+               min_topic_score: float, max_age: float) -> list:
+        """
+        Returns up to `k` results most similar to `query`, best first, that score at least
+        `min_score`, were fetched for a topic scoring at least `min_topic_score` against
+        `topic`, and are at most `max_age` seconds old. The topic bounds the domain a result
+        may cover, so a section can be served by results fetched for differently worded
+        sections or related topics, but not by unrelated ones.
+        """
+        with self._lock:
+            matrix = self._mapped_matrix()
+            if matrix is None:
+                return []
+            topic_vector = embed_text(topic)
+            topic_scores = {
+                origin: float(self._topic_vector(origin) @ topic_vector) if origin else 0.0
+                for origin in set(self._topics)
+            }
+            eligible = np.fromiter(
+                (topic_scores[origin] >= min_topic_score for origin in self._topics), dtype=bool, count=len(self._topics)
+            )
+            eligible &= np.asarray(self._fetched_at, dtype=np.float64) >= time.time() - max_age
+            if not eligible.any():
+                return []
+            scores = np.where(eligible, matrix @ embed_text(query), -np.inf)
+            k = min(k, int(eligible.sum()))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [self._records[i] for i in top if scores[i] >= min_score]
+
+    def __len__(self):
+        return len(self._records)
+
+_corpus_index = None
+_corpus_index_lock = threading.Lock()
+
+def get_corpus_index() -> CorpusIndex:
+    """Returns the process-wide corpus index, loading it on first use."""
+    global _corpus_index
+    with _corpus_index_lock:
+        if _corpus_index is None:
+            _corpus_index = CorpusIndex()
+        return _corpus_index
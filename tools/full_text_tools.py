@@ -0,0 +1,169 @@
+# full_text_tools.py
+
+import codecs
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from html.parser import HTMLParser
+import httpx
+import cassette
+from cassette import recorded_fetch
+from tools.search_result import SearchResult
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+MAX_FETCH_BYTES = 512 * 1024   # Stop reading a page after this many bytes
+MAX_FETCH_SECONDS = 8.0        # Give up on a page after this long
+MAX_TEXT_CHARS = 6000          # Keep at most this much extracted text per page
+MAX_CONCURRENT_FETCHES = 8
+CACHE_SIZE = 512
+
+# Elements whose text is never part of the article body
+SKIPPED_TAGS = {"script", "style", "noscript", "svg", "nav", "header", "footer", "aside", "form", "template"}
+BLOCK_TAGS = {"p", "div", "br", "li", "h1", "h2", "h3", "h4", "h5", "h6", "tr", "section", "article"}
+
+_text_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+class _StreamingTextExtractor(HTMLParser):
+    """Extracts readable text from HTML fed in chunks, stopping once enough text is collected."""
+
+    def __init__(self, max_chars: int):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.parts = []
+        self.length = 0
+        self._skip_depth = 0
+
+    @property
+    def done(self) -> bool:
+        return self.length >= self.max_chars
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if self._skip_depth or self.done:
+            return
+        text = " ".join(data.split())
+        if text:
+            self.parts.append(text + " ")
+            self.length += len(text) + 1
+
+    def text(self) -> str:
+        lines = (" ".join(line.split()) for line in "".join(self.parts).split("\n"))
+        return "\n".join(line for line in lines if line)[:self.max_chars]
+
+async def _stream_page_text(client: httpx.AsyncClient, url: str) -> str:
+    """
+    Streams a page and extracts its text, reading at most MAX_FETCH_BYTES.
+    Returns an empty string for non-text content or on any error.
+    """
+    try:
+        async with client.stream("GET", url) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("content-type", "")
+            if "html" not in content_type and "text/plain" not in content_type:
+                return ""
+            decoder = codecs.getincrementaldecoder(response.charset_encoding or "utf-8")(errors="replace")
+            is_html = "html" in content_type
+            extractor = _StreamingTextExtractor(MAX_TEXT_CHARS) if is_html else None
+            plain_parts = []
+            received = 0
+            async for chunk in response.aiter_bytes():
+                chunk = chunk[:MAX_FETCH_BYTES - received]
+                received += len(chunk)
+                text = decoder.decode(chunk)
+                if is_html:
+                    extractor.feed(text)
+                    if extractor.done:
+                        break
+                else:
+                    plain_parts.append(text)
+                if received >= MAX_FETCH_BYTES:
+                    break
+        return extractor.text() if is_html else "".join(plain_parts)[:MAX_TEXT_CHARS].strip()
+    except Exception as e:
+        logging.warning(f"Full-text fetch failed for '{url}': {e}")
+        return ""
+
+@recorded_fetch
+async def fetch_full_text(client: httpx.AsyncClient, url: str) -> str:
+    """
+    Returns the extracted text of a page, or an empty string if it cannot be fetched
+    within MAX_FETCH_SECONDS. The timeout is applied inside the cassette boundary, so a
+    recording stores the empty result and a replay reproduces it.
+    """
+    try:
+        return await asyncio.wait_for(_stream_page_text(client, url), timeout=MAX_FETCH_SECONDS)
+    except asyncio.TimeoutError:
+        logging.warning(f"Full-text fetch for '{url}' exceeded {MAX_FETCH_SECONDS:g}s; keeping the snippet.")
+        return ""
+
+async def _cached_fetch(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, url: str) -> str:
+    # The cache sits outside the cassette boundary, so it is bypassed while a cassette is active
+    use_cache = not cassette.is_active()
+    if use_cache:
+        with _cache_lock:
+            if url in _text_cache:
+                _text_cache.move_to_end(url)
+                return _text_cache[url]
+    async with semaphore:
+        text = await fetch_full_text(client, url)
+    if not use_cache or not text:
+        # Failures and timeouts may be transient, so only extracted text is cached
+        return text
+    with _cache_lock:
+        _text_cache[url] = text
+        while len(_text_cache) > CACHE_SIZE:
+            _text_cache.popitem(last=False)
+    return text
+
+async def enrich_with_full_text(results: list, top_n: int) -> list:
+    """
+    Replaces the snippets of the top `top_n` web results of each section with the full text
+    of the page, when that text is longer than the snippet. Results keep their original order.
+    """
+    selected = {}
+    per_section = {}
+    for position, result in enumerate(results):
+        if not (result.url or "").startswith(("http://", "https://")):
+            continue
+        if per_section.get(result.section_id, 0) >= top_n:
+            continue
+        per_section[result.section_id] = per_section.get(result.section_id, 0) + 1
+        selected[position] = result.url
+    if not selected:
+        return results
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+    limits = httpx.Limits(max_connections=MAX_CONCURRENT_FETCHES, max_keepalive_connections=MAX_CONCURRENT_FETCHES)
+    async with httpx.AsyncClient(timeout=MAX_FETCH_SECONDS, follow_redirects=True, limits=limits,
+                                 headers={"User-Agent": "Mozilla/5.0 (research-agent)"}) as client:
+        urls = sorted(set(selected.values()))
+        texts = await asyncio.gather(*(_cached_fetch(client, semaphore, url) for url in urls), return_exceptions=True)
+    text_by_url = {}
+    for url, text in zip(urls, texts):
+        if isinstance(text, Exception):
+            # e.g. a replayed cassette without this page; the result keeps its snippet
+            logging.warning(f"Full-text enrichment skipped '{url}': {text}")
+            continue
+        text_by_url[url] = text
+
+    enriched = list(results)
+    replaced = 0
+    for position, url in selected.items():
+        text = text_by_url.get(url)
+        if text and len(text) > len(enriched[position].summary or ""):
+            enriched[position] = enriched[position].with_summary(text)
+            replaced += 1
+    logging.info(f"Full-text enrichment replaced {replaced} of {len(selected)} selected snippets.")
+    return enriched
@@ -5,6 +5,8 @@ import logging
 import asyncio
 import httpx
 from dotenv import load_dotenv
+from cassette import recorded_search
+from tools.search_result import SearchResult
 
 load_dotenv()
 
@@ -15,6 +17,7 @@ NEWS_API_KEY = os.environ.get("NEWS_API_KEY")
 # THE DEFINITIVE FIX: Create a lock to serialize requests to the NewsAPI.
 news_api_lock = asyncio.Lock()
 
+@recorded_search
 async def search_news(query: str, max_results: int = 5) -> list:
     """Asynchronously searches for news articles using the NewsAPI."""
     if not NEWS_API_KEY:
@@ -35,12 +38,12 @@ async def search_news(query: str, max_results: int = 5) -> list:
                 data = response.json()
                 articles = data.get("articles", [])
                 logging.info(f"NewsAPI search for '{query}' returned {len(articles)} articles.")
-                return [{
-                    "title": article.get("title"), 
-                    "summary": article.get("description"),
-                    "url": article.get("url"),
-                    "source": "NewsAPI"
-                } for article in articles]
+                return [SearchResult(
+                    title=article.get("title"),
+                    summary=article.get("description"),
+                    url=article.get("url"),
+                    source="NewsAPI"
+                ) for article in articles]
             except httpx.HTTPStatusError as e:
                 logging.error(f"HTTP error during NewsAPI search: {e.response.status_code}")
                 return []
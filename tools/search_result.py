@@ -0,0 +1,50 @@
+# search_result.py
+
+import sys
+
+class SearchResult:
+    """
+    A single immutable search hit returned by the `tools/` search functions.
+    Source names are interned, the section is referenced by its index in the outline,
+    and the context text handed to the writer and critiquer is formatted once, on first use.
+    """
+    __slots__ = ("title", "summary", "url", "source", "section_id", "_context_text")
+
+    def __init__(self, title: str, summary: str, url: str, source: str, section_id: int = None):
+        object.__setattr__(self, "title", title)
+        object.__setattr__(self, "summary", summary)
+        object.__setattr__(self, "url", url)
+        object.__setattr__(self, "source", sys.intern(source) if source else source)
+        object.__setattr__(self, "section_id", section_id)
+        object.__setattr__(self, "_context_text", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"SearchResult is immutable; cannot set '{name}'")
+
+    def __repr__(self):
+        return f"SearchResult(source={self.source!r}, url={self.url!r}, section_id={self.section_id!r})"
+
+    def with_section(self, section_id: int) -> "SearchResult":
+        """Returns a copy of this result tagged with the given outline section index."""
+        return SearchResult(self.title, self.summary, self.url, self.source, section_id)
+
+    def with_summary(self, summary: str) -> "SearchResult":
+        """Returns a copy of this result with its summary replaced, e.g. by the page's full text."""
+        return SearchResult(self.title, summary, self.url, self.source, self.section_id)
+
+    @property
+    def context_text(self) -> str:
+        """The result formatted as a context block for the writer and critiquer."""
+        if self._context_text is None:
+            object.__setattr__(
+                self, "_context_text", f"**Source:** {self.url or 'N/A'}\n**Content:** {self.summary or 'N/A'}"
+            )
+        return self._context_text
+
+    def to_dict(self) -> dict:
+        """Returns the result's content as a plain dict, e.g. for JSON storage."""
+        return {"title": self.title, "summary": self.summary, "url": self.url, "source": self.source}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SearchResult":
+        return cls(data.get("title"), data.get("summary"), data.get("url"), data.get("source"))
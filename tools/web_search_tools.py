@@ -4,6 +4,8 @@ import os
 import logging
 from langchain_tavily import TavilySearch
 from dotenv import load_dotenv
+from cassette import recorded_search
+from tools.search_result import SearchResult
 
 load_dotenv()
 
@@ -14,6 +16,7 @@ TAVILY_API_KEY = os.environ.get("TAVILY_API_KEY")
 if not TAVILY_API_KEY:
     logging.warning("TAVILY_API_KEY not found in environment variables. Web search will be disabled.")
 
+@recorded_search
 async def search_tavily(query: str, max_results: int = 7) -> list:
     """
     Asynchronously performs a web search using the Tavily API and robustly formats the results.
@@ -30,19 +33,19 @@ async def search_tavily(query: str, max_results: int = 7) -> list:
         if isinstance(results, list):
             for res in results:
                 if isinstance(res, dict):
-                    formatted_results.append({
-                        "title": res.get("title", "No Title Available"),
-                        "summary": res.get("content", "No content available."),
-                        "url": res.get("url", ""),
-                        "source": "Tavily Web Search"
-                    })
+                    formatted_results.append(SearchResult(
+                        title=res.get("title", "No Title Available"),
+                        summary=res.get("content", "No content available."),
+                        url=res.get("url", ""),
+                        source="Tavily Web Search"
+                    ))
                 elif isinstance(res, str):
-                    formatted_results.append({
-                        "title": "Web Search Result",
-                        "summary": res,
-                        "url": "",
-                        "source": "Tavily Web Search"
-                    })
+                    formatted_results.append(SearchResult(
+                        title="Web Search Result",
+                        summary=res,
+                        url="",
+                        source="Tavily Web Search"
+                    ))
         
         return formatted_results
         